@@ -15,6 +15,8 @@ Usage examples:
 
 import os
 import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from src import utils, filters, plotting, update_dashboard
 
@@ -43,83 +45,125 @@ ALL_FILTERS = [
 ]
 ALL_PLOTS = ['bar', 'timeline']
 
-def make_plot(df: pd.DataFrame, metric: str, filter: str, plot: str, 
-              month_dt: pd.Timestamp, compare_dt: pd.Timestamp) -> None:
-    # filter data
-    config = filters.load_filter_config(filter)
-    df = filters.apply_filters(df, config)     
+# bracket filters only cover impressions
+BRACKET_FILTERS = ['age-brackets', 'income-brackets']
+BRACKET_METRICS = ['reach_imp', 'grp_imp']
+
+# valid (filter, metric, plot) combinations for --run-all
+ALL_TASKS = [
+    (filter, metric, plot)
+    for filter in ALL_FILTERS
+    for metric in ALL_METRICS
+    for plot in ALL_PLOTS
+    if not (filter in BRACKET_FILTERS and metric not in BRACKET_METRICS)
+]
 
-    # handle custom bracket columns, if needed
-    error_msg = (
-        f'For the filters "income-brackets" or "age-brackets", only the metrics '
-        f'"reach_imp" and "grp_imp" are allowed, not "{metric}".'
-    )
-    
-    if filter == 'income-brackets':
-        if metric not in ['reach_imp', 'grp_imp']: raise ValueError(error_msg)
-        df = filters.create_income_brackets(df, metric)
-    
-    elif filter == 'age-brackets':
-        if metric not in ['reach_imp', 'grp_imp']: raise ValueError(error_msg)
-        df = filters.create_age_brackets(df, metric)
-        
-    df.to_csv(os.path.join(CSV_OUTPUT_DIR, 'working-data.csv'), index=False)  
+def prepare_data(df: pd.DataFrame, filter: str, config: dict[str, list[str] | str]) -> pd.DataFrame:
+    """Apply a filter config to df, and create custom bracket columns if the filter needs them."""
+    df = filters.apply_filters(df, config)
+    if filter == 'income-brackets': df = filters.create_income_brackets(df)
+    elif filter == 'age-brackets': df = filters.create_age_brackets(df)
+    return df
+
+def make_plot(df: pd.DataFrame, metric: str, filter: str, plots: list[str], 
+              month_dt: pd.Timestamp, compare_dt: pd.Timestamp,
+              data_cache: dict[str, pd.DataFrame] | None = None,
+              dump_working: bool = False, log: list[str] | None = None) -> None:
+    # brackets only cover impressions
+    if filter in BRACKET_FILTERS and metric not in BRACKET_METRICS:
+        raise ValueError(
+            f'For the filters "income-brackets" or "age-brackets", only the metrics '
+            f'"reach_imp" and "grp_imp" are allowed, not "{metric}".'
+        )
+
+    # filter data, and handle custom bracket columns, reusing prepared data across calls if cached
+    config = filters.load_filter_config(filter)
+    if data_cache is None:
+        df = prepare_data(df, filter, config)
+    else:
+        if filter not in data_cache: data_cache[filter] = prepare_data(df, filter, config)
+        df = data_cache[filter]
 
     # set group column/s
     group_cols = ['month']
     group_col = filters.get_group_column(config) # column name, or None   
     if group_col: group_cols.append(group_col)    
-    
-    # plot
-    metric_filename = metric.replace('_', '-')
-    output_html = os.path.join(HTML_OUTPUT_DIR, f'{plot}_{filter}_{metric_filename}.html')
-    title = f'{plotting.clean(metric)} for {config["title"]}'
 
-    if plot == 'timeline':
-        # filter range of months (inclusive)
-        df_timeline = df[(df['month'] >= compare_dt) & (df['month'] <= month_dt)]
-
-        # aggregate trend, and set legend order for plot if applicable 
-        trend = df_timeline.groupby(group_cols, as_index=False)[metric].sum()
-        trend = filters.set_ordered_categories(trend, group_col, config)        
+    # optionally save columns used by the plot, for inspection
+    metric_filename = metric.replace('_', '-')
+    if dump_working:
+        df[group_cols + [metric]].to_csv(
+            os.path.join(CSV_OUTPUT_DIR, f'working-data_{filter}_{metric_filename}.csv'), 
+            index=False, chunksize=100_000)
+    
+    # aggregate by month/s and any categories once, for all plots
+    totals = df.groupby(group_cols, as_index=False, observed=True)[metric].sum()
+
+    # if a log is given, log a plot that fails and continue with the next, otherwise raise
+    for plot in plots:
+        try:
+            output_html = os.path.join(HTML_OUTPUT_DIR, f'{plot}_{filter}_{metric_filename}.html')
+            title = f'{plotting.clean(metric)} for {config["title"]}'
+
+            if plot == 'timeline':
+                # filter range of months (inclusive), and set legend order for plot if applicable 
+                trend = filters.select_month_range(totals, compare_dt, month_dt)
+                trend = filters.set_ordered_categories(trend, group_col, config)        
+            
+                plotting.plot_timeline(
+                    trend, 
+                    x='month', 
+                    y=metric, 
+                    color=group_col,
+                    title=title, 
+                    output_file=output_html, 
+                    config=config)
+            
+            if plot == 'bar':
+                # keep only selected months, and label months in comparison order
+                months = [month_dt]
+                if compare_dt: months.append(compare_dt)
+                month_labels = {m: m.strftime('%b %Y') for m in [compare_dt, month_dt] if m is not None}
+                bar = filters.select_months(totals, months).assign(month=lambda d: pd.Categorical(
+                    d['month'].map(month_labels),
+                    categories=list(dict.fromkeys(month_labels.values()))
+                ))
         
-        plotting.plot_timeline(
-            trend, 
-            x='month', 
-            y=metric, 
-            color=group_col,
-            title=title, 
-            output_file=output_html, 
-            config=config)
+                # force category order for grouping column
+                bar = filters.set_ordered_categories(bar, group_col, config)
         
-    if plot == 'bar':
-        # keep only selected months
-        months = [month_dt]
-        if compare_dt: months.append(compare_dt)
-        df_bar = df[df['month'].isin(months)]
- 
-        # aggregate by month/s and any categories, and format month
-        bar = df_bar.groupby(group_cols, as_index=False)[metric].sum()
-        bar['month'] = bar['month'].dt.strftime('%b %Y')
-    
-        # force category order for grouping column
-        bar = filters.set_ordered_categories(bar, group_col, config)
-    
-        # append title
-        month_label = month_dt.strftime('%b %Y')
-        comparison = f'{compare_dt.strftime("%b %Y")} vs. ' if compare_dt else ''
-        title += f' - {comparison}{month_label}'
-    
-        plotting.plot_bar(
-            bar,
-            x=group_col if group_col else 'month',
-            y=metric,
-            color='month' if group_col and len(months) > 1 else None,
-            title=title,
-            output_file=output_html, 
-        )    
+                # append title
+                month_label = month_labels[month_dt]
+                comparison = f'{month_labels[compare_dt]} vs. ' if compare_dt else ''
+                title += f' - {comparison}{month_label}'
+        
+                plotting.plot_bar(
+                    bar,
+                    x=group_col if group_col else 'month',
+                    y=metric,
+                    color='month' if group_col and len(months) > 1 else None,
+                    title=title,
+                    output_file=output_html, 
+                )    
+        except Exception as e:
+            if log is None: raise
+            log.append(f'Skipped {plot} for {filter} / {metric}: {e}')
     
 
+def run_tasks(df: pd.DataFrame, tasks: list[tuple[str, str, str]], month_dt: pd.Timestamp, 
+              compare_dt: pd.Timestamp, dump_working: bool = False) -> list[str]:
+    """Run (filter, metric, plot) tasks on df in a worker process, and return log lines."""
+    log = []
+    data_cache = {}
+    for (filter, metric), group in itertools.groupby(tasks, key=lambda task: task[:2]):
+        plots = [plot for _, _, plot in group]
+        log.append(f'Running {", ".join(plots)} for {filter} / {metric}')
+        try:
+            make_plot(df, metric, filter, plots, month_dt, compare_dt, data_cache, dump_working, log)
+        except Exception as e:
+            log.append(f'Skipped {", ".join(plots)} for {filter} / {metric}: {e}')
+    return log
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument('-m', '--metric', default='reach_imp',
@@ -132,6 +176,8 @@ def main() -> None:
     parser.add_argument('--compare-month', help='Optional comparison month for bar chart, or timeline\'s start month, in YYYY-MM format') 
     parser.add_argument('-a', '--run-all', action='store_true', help='Run plots for all filters and metrics')
     parser.add_argument('-d', '--dashboard', action='store_true', help='Update and open local index.html dashboard')
+    parser.add_argument('--dump-working', action='store_true', 
+                        help='Save the data behind each plot to output/csv/working-data_<filter>_<metric>.csv')
     
     args = parser.parse_args()
 
@@ -151,26 +197,28 @@ def main() -> None:
     for directory in [HTML_OUTPUT_DIR, CSV_OUTPUT_DIR]:
         os.makedirs(directory, exist_ok=True)
 
-    # run all plots
+    # run all plots, with each filter's tasks in one worker process, and print each filter's log in order;
+    # each worker is sent only its filter's rows, so the whole dataset is not copied to every process
     if args.run_all:
-        for filter in ALL_FILTERS:
-            print()
-            for metric in ALL_METRICS:                
-                for plot in ALL_PLOTS:
-                    if filter in ['age-brackets', 'income-brackets'] and metric not in ['reach_imp', 'grp_imp']:
-                        print(f'Skipping {plot} for {filter} / {metric}: invalid combination.')
-                        continue
-                    print(f'Running {plot} for {filter} / {metric}')
-                    try:
-                        make_plot(df, metric, filter, plot, month_dt, compare_dt)
-                    except Exception as e:
-                        print(f'Skipped {plot} for {filter} / {metric}: {e}')
-
-        update_dashboard.run()
+        max_workers = min(len(ALL_FILTERS), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(run_tasks, filters.apply_filters(df, filters.load_filter_config(filter)),
+                                [task for task in ALL_TASKS if task[0] == filter],
+                                month_dt, compare_dt, args.dump_working)
+                for filter in ALL_FILTERS
+            ]
+            for future in futures:
+                print()
+                print('\n'.join(future.result()))
+
+        # select the last task's plot, since parallel workers finish files in any order
+        filter, metric, plot = ALL_TASKS[-1]
+        update_dashboard.run(selected_file=f'{plot}_{filter}_{metric.replace("_", "-")}.html')
         return    
 
     # run just one plot
-    make_plot(df, args.metric, args.filter, args.plot, month_dt, compare_dt)    
+    make_plot(df, args.metric, args.filter, [args.plot], month_dt, compare_dt, dump_working=args.dump_working)
     update_dashboard.run()     
 
 # only run when this script is executed directly
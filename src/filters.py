@@ -6,22 +6,54 @@ and creating exclusive bracket groupings for age and income.
 """
 
 
+import copy
+import functools
 import json
+import numpy as np
 import pandas as pd
 
-def load_filter_config(filter: str) -> dict[str, list[str] | str]:
-    """Load filter configuration from JSON."""
+@functools.lru_cache(maxsize=None)
+def _read_filter_config(filter: str) -> dict[str, list[str] | str]:
+    """Read and parse a filter configuration JSON once per process."""
     with open(f'config/{filter}.json') as f:
         return json.load(f)
 
+def load_filter_config(filter: str) -> dict[str, list[str] | str]:
+    """Load filter configuration from JSON (cached, returned as a fresh copy)."""
+    return copy.deepcopy(_read_filter_config(filter))
+
 def apply_filters(df: pd.DataFrame, config: dict[str, list[str] | str]) -> pd.DataFrame:
     """Filter df by 'daypart', 'demographic', and 'characteristic' from a configuration dict."""
     cols_to_filter = ['daypart', 'demographic', 'characteristic']
+    mask = np.ones(len(df), dtype=bool)
     for key, val in config.items():
         if key in cols_to_filter:
-            if isinstance(val, list): df = df[df[key].isin(val)]
-            else: df = df[df[key] == val]
-    return df
+            vals = val if isinstance(val, list) else [val]
+            if isinstance(df[key].dtype, pd.CategoricalDtype):
+                # compare integer codes, skipping values that are not categories
+                codes = df[key].cat.categories.get_indexer(vals)
+                mask &= np.isin(df[key].cat.codes.to_numpy(), codes[codes >= 0])
+            else:
+                mask &= df[key].isin(vals).to_numpy()
+    return df[mask]
+
+def select_month_range(df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """Return rows with 'month' from start to end (inclusive), by binary search if sorted by month."""
+    if start is None or end is None:
+        raise ValueError(f'Month range needs a start and end month, not {start} to {end}')
+    months = df['month']
+    if not months.is_monotonic_increasing:
+        return df[(months >= start) & (months <= end)]
+    lo = months.searchsorted(start, side='left')
+    hi = months.searchsorted(end, side='right')
+    return df.iloc[lo:hi]
+
+def select_months(df: pd.DataFrame, months: list[pd.Timestamp]) -> pd.DataFrame:
+    """Return rows with 'month' in months, by binary search if sorted by month."""
+    if not df['month'].is_monotonic_increasing:
+        return df[df['month'].isin(months)]
+    # slice each distinct month once, so a month given twice does not repeat rows
+    return pd.concat([select_month_range(df, month, month) for month in sorted(set(months))])
 
 def get_group_column(config: dict[str, list[str] | str]) -> str | None:
     """Return name of first column with multiple values, or None if none found."""
@@ -37,11 +69,15 @@ def set_ordered_categories(
  ) -> pd.DataFrame:
     """Set category order for plotly legends, if grouping column exists in config."""
     if group_col and isinstance(config.get(group_col), list):
-        df[group_col] = pd.Categorical(
-            df[group_col],
-            categories=config[group_col],
-            ordered=True
-        )
+        if isinstance(df[group_col].dtype, pd.CategoricalDtype):
+            ordered = df[group_col].cat.set_categories(config[group_col], ordered=True)
+        else:
+            ordered = pd.Categorical(
+                df[group_col],
+                categories=config[group_col],
+                ordered=True
+            )
+        df = df.assign(**{group_col: ordered})
     return df
     
 def create_wide_brackets(
@@ -69,22 +105,23 @@ def create_wide_brackets(
         pd.DataFrame: A wide-format DataFrame with summed values for each exclusive bracket
                       and each metric (e.g., 'reach_imp_25_50k', 'grp_imp_25_50k').
     """    
-    df = df.copy()    
-    bracket_data = {col: df[col] for col in group_cols}
-
+    # one row per group, and one column per (metric, category), with missing categories as 0
+    labels = list(dict.fromkeys(label for expr in bracket_expr.values() for label in expr))
+    wide = (
+        df.groupby(group_cols + [source_col], observed=True)[metrics].sum()
+        .unstack(source_col, fill_value=0)
+        .reindex(columns=pd.MultiIndex.from_product([metrics, labels]), fill_value=0)
+    )
+
+    bracket_data = {}
     for metric in metrics:
-        for name, expr in bracket_expr.items():
-            col = f'{metric}_{name}'
-            if len(expr) == 1:
-                bracket_data[col] = df[metric].where(df[source_col] == expr[0], 0)
-            else:
-                result = df[metric].where(df[source_col] == expr[0], 0)
-                for subtract in expr[1:]:
-                    result -= df[metric].where(df[source_col] == subtract, 0)
-                bracket_data[col] = result
+        for name, (add, *subtract) in bracket_expr.items():
+            result = wide[(metric, add)]
+            for label in subtract:
+                result = result - wide[(metric, label)]
+            bracket_data[f'{metric}_{name}'] = result
 
-    bracket_df = pd.DataFrame(bracket_data)
-    return bracket_df.groupby(group_cols, as_index=False).sum()
+    return pd.DataFrame(bracket_data, index=wide.index).reset_index()
 
 def melt_brackets(
     df: pd.DataFrame,
@@ -107,21 +144,23 @@ def melt_brackets(
 
     Returns a DataFrame with one row per [group + bracket] and one column per metric.
     """
-    bracket_names = list(bracket_labels_map.keys())
-    records = []
-
-    for bracket in bracket_names:
-        row_group = df[group_cols].copy()
-        row_group[bracket_col] = bracket_labels_map[bracket]
-        for metric in metrics:
-            col = f"{metric}_{bracket}"
-            if col in df.columns:
-                row_group[metric] = df[col]
-        records.append(row_group)
-
-    melted = pd.concat(records, ignore_index=True)
-    melted[bracket_col] = melted[bracket_col].astype(str)
-    return melted
+    bracket_cols = [f'{metric}_{bracket}' for metric in metrics for bracket in bracket_labels_map]
+    metrics = [metric for metric in metrics if any(col.startswith(f'{metric}_') for col in df.columns)]
+
+    melted = pd.wide_to_long(
+        df[group_cols + [col for col in bracket_cols if col in df.columns]],
+        stubnames=metrics,
+        i=group_cols,
+        j='bracket_key',
+        sep='_',
+        suffix=r'\w+'
+    ).reset_index()
+
+    melted[bracket_col] = pd.Categorical(
+        melted['bracket_key'].map(bracket_labels_map),
+        categories=list(bracket_labels_map.values())
+    )
+    return melted[group_cols + [bracket_col] + metrics]
 
 
 
@@ -1,13 +1,38 @@
+import functools
 import re
+import numpy as np
 import plotly.express as px
 from plotly.graph_objs import Figure
 import pandas as pd
 
+# layout shared by all plots
+FONT_FAMILY = '"Open Sans", verdana, arial, sans-serif'
+FONT_COLOR = 'rgb(71, 71, 71)'
+AXIS_LAYOUT = dict(
+    color=FONT_COLOR,
+    title_font=dict(color=FONT_COLOR),
+    tickfont=dict(color=FONT_COLOR)
+)
+COMMON_LAYOUT = dict(
+    font=dict(size=16, family=FONT_FAMILY, color=FONT_COLOR),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    margin=dict(l=100, r=50, t=90, b=60),
+    hoverlabel=dict(
+        font_color='white',
+        bordercolor='white'
+    ),
+    xaxis_title=None
+)
+
+WHITESPACE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=256)
 def clean(s: str) -> str:
     """Replace '_' and '-' and extra spaces in string, and capitalize words."""
     if s:
         s = s.replace('_', ' ').replace('-', ' ')
-        s = re.sub(r'\s+', ' ', s).strip()
+        s = WHITESPACE.sub(' ', s).strip()
         return ' '.join(word.capitalize() for word in s.split())
     return ''
 
@@ -34,44 +59,28 @@ def common_layout(
     Returns:
         Figure: The updated Plotly figure with applied layout.
     """
-    font_family = '"Open Sans", verdana, arial, sans-serif'
-    font_color = 'rgb(71, 71, 71)'
     y_max = df[y].max() * 1.12 if df is not None and y in df else None
     
     fig.update_layout(
-        font=dict(size=16, family=font_family, color=font_color),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        margin=dict(l=100, r=50, t=90, b=60),
+        **COMMON_LAYOUT,
         showlegend=bool(color),
         title=dict(
             text=title,
-            font=dict(size=22, family=font_family, color=font_color)
-        ),
-        xaxis_title=None,         
-        xaxis=dict(
-            title=clean(x),
-            color=font_color,
-            title_font=dict(color=font_color),
-            tickfont=dict(color=font_color)
+            font=dict(size=22, family=FONT_FAMILY, color=FONT_COLOR)
         ),
+        xaxis=dict(title=clean(x), **AXIS_LAYOUT),
         yaxis=dict(
             title=clean(y),
-            color=font_color,
-            title_font=dict(color=font_color),
-            tickfont=dict(color=font_color),
-            range=[0, y_max] if y_max else None
-        ),
-        hoverlabel=dict(
-            font_color='white',
-            bordercolor='white'
+            range=[0, y_max] if y_max else None,
+            **AXIS_LAYOUT
         ),
     )
     return fig
 
-def format_tooltip(df: pd.DataFrame, x: str, y: str, color: str | None = None) -> tuple[str, str]:
+def format_tooltip(df: pd.DataFrame, x: str, y: str, color: str | None = None) -> tuple[str, list]:
     """
-    Adds formatted columns to `df` and returns hovertemplate + customdata list.
+    Formats tooltip values from `df`, without adding columns to it, and returns 
+    hovertemplate + customdata list.
 
     Args:
         df (pd.DataFrame): The dataframe used in the plot.
@@ -80,25 +89,27 @@ def format_tooltip(df: pd.DataFrame, x: str, y: str, color: str | None = None) -
         color (str, optional): Column name for color grouping.
 
     Returns:
-        tuple[str, str]: A tuple containing:
+        tuple[str, list]: A tuple containing:
             - hovertemplate (str): A Plotly-formatted string for displaying tooltips.
-            - customdata (str): A comma-separated string of column names used in customdata.
+            - customdata (list): Arrays of formatted x and y values, aligned with rows of `df`,
+                                 plus the color column name if given.
     """
     # format x
     if pd.api.types.is_datetime64_any_dtype(df[x]):         
-        df['x_fmt'] = pd.to_datetime(df[x]).dt.strftime('%b %Y') # like 'Apr 2025'
+        x_fmt = df[x].dt.strftime('%b %Y').to_numpy() # like 'Apr 2025'
     else:
-        df['x_fmt'] = df[x].astype(str)
+        x_fmt = df[x].astype(str).to_numpy()
         
     # format y    
     float_metrics = {'reach%', 'avg_freq'}
     if y in float_metrics: 
-        df['metric_fmt'] = df[y].apply(lambda v: f'{v:,.2f}') # like 5.30
+        metric_fmt = df[y].map('{:,.2f}'.format).to_numpy() # like 5.30
     else: 
-        df['metric_fmt'] = df[y].apply(lambda x: f'{int(round(x)):,}') # like 36,720
+        rounded = pd.Series(np.round(df[y].to_numpy()).astype(np.int64))
+        metric_fmt = rounded.map('{:,}'.format).to_numpy() # like 36,720
     
-    custom_cols = ['x_fmt', 'metric_fmt']
-    if color: custom_cols.append(color)
+    custom_data = [x_fmt, metric_fmt]
+    if color: custom_data.append(color)
 
     if pd.api.types.is_datetime64_any_dtype(df[x]):
         hovertemplate = (
@@ -115,7 +126,7 @@ def format_tooltip(df: pd.DataFrame, x: str, y: str, color: str | None = None) -
             '<extra></extra>'
         )
 
-    return hovertemplate, custom_cols
+    return hovertemplate, custom_data
 
 def plot_timeline(
     df: pd.DataFrame,
@@ -141,7 +152,7 @@ def plot_timeline(
     Returns:
         plotly.graph_objs.Figure: The generated Plotly figure.
     """
-    hovertemplate, custom_cols = format_tooltip(df, x, y, color)   
+    hovertemplate, custom_data = format_tooltip(df, x, y, color)   
     fig = px.line(
         df,
         x=x,
@@ -151,13 +162,13 @@ def plot_timeline(
         markers=True,
         labels={x: clean(x), y: clean(y), color: clean(color) if color else None},
         category_orders={color: config[color]} if color and config and config.get(color) else {},
-        custom_data=custom_cols, 
+        custom_data=custom_data, 
         template='simple_white',
     )
     fig = common_layout(fig, title, x, y, color, df)
     fig.update_traces(line=dict(width=4), marker=dict(size=4))
     fig.update_traces(hovertemplate=hovertemplate)    
-    fig.write_html(output_file)
+    fig.write_html(output_file, include_plotlyjs='cdn', full_html=True, auto_open=False)
     return fig
 
 def plot_bar(
@@ -182,11 +193,12 @@ def plot_bar(
     Returns:
         plotly.graph_objs.Figure: The generated Plotly figure.
     """
-    hovertemplate, custom_cols = format_tooltip(df, x, y, color) 
+    hovertemplate, custom_data = format_tooltip(df, x, y, color) 
     
     category_orders = {}
-    if x in df.columns and pd.api.types.is_categorical_dtype(df[x]):
-        category_orders[x] = df[x].cat.categories.tolist()   
+    for col in [x, color]:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            category_orders[col] = df[col].cat.categories.tolist()   
         
     fig = px.bar(
         df,
@@ -197,11 +209,11 @@ def plot_bar(
         title=title,
         labels={x: clean(x), y: clean(y), color: clean(color) if color else None},
         category_orders=category_orders,
-        custom_data=custom_cols,
+        custom_data=custom_data,
         template='simple_white',
     )
     fig = common_layout(fig, title, x, y, color, df)
     fig.update_traces(marker=dict(line=dict(width=2, color='white')))
     fig.update_traces(hovertemplate=hovertemplate)
-    fig.write_html(output_file)
+    fig.write_html(output_file, include_plotlyjs='cdn', full_html=True, auto_open=False)
     return fig
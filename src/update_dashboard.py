@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-import re
 import webbrowser
 
 # mapping of filename parts to friendly display names
@@ -30,7 +29,7 @@ def display_name(filename: str, rename_map: dict) -> str:
     ]
     return ' | '.join(friendly_parts) if len(friendly_parts) > 1 else friendly_parts[0]
     
-def run(open_webbrowser=False):
+def run(open_webbrowser=False, selected_file=None):
     html_dir = Path('output/html')
     output_path = Path('index.html')
 
@@ -38,17 +37,21 @@ def run(open_webbrowser=False):
         print(f'Directory not found: {html_dir}')
         return
     
-    # get list of .html files (preserve directory order), and determine newest file
-    files = [f for f in html_dir.iterdir() if f.is_file() and f.suffix == '.html']
+    # get list of .html files (preserve directory order), and determine file to select;
+    # file type comes from the scandir listing; stat() is cached per entry
+    with os.scandir(html_dir) as entries:
+        files = [f for f in entries if f.is_file() and f.name.endswith('.html')]
 
     # build HTML <select> element
     if not files:
         select_block = '      <p>No files to display.</p>'
     else:
-        newest_file = max(files, key=lambda f: f.stat().st_mtime).name
+        # select the given file if it exists, otherwise the newest file
+        names = [f.name for f in files]
+        if selected_file not in names: selected_file = max(files, key=lambda f: f.stat().st_mtime).name
         option_lines = []
         for f in files:
-            selected_attr = ' selected' if f.name == newest_file else ''
+            selected_attr = ' selected' if f.name == selected_file else ''
             selected_name = display_name(f.name, rename_map)
             option_lines.append(f'        <option value="output/html/{f.name}"{selected_attr}>{selected_name}</option>')
         
@@ -62,16 +65,16 @@ def run(open_webbrowser=False):
     # read HTML file
     html = output_path.read_text(encoding='utf-8')
 
-    # replace <select> element
-    updated_html = re.sub(
-        r' {6}<select id=\"plotSelect\">.*?</select>',
-        select_block,
-        html,
-        flags=re.DOTALL
-    )   
+    # replace <select> element, if found
+    start = html.find('      <select id="plotSelect">')
+    end = html.find('</select>', start)
+    if start == -1 or end == -1:
+        updated_html = html
+    else:
+        updated_html = html[:start] + select_block + html[end + len('</select>'):]
 
-    # write updated html 
-    output_path.write_text(updated_html, encoding='utf-8')
+    # write updated html, if changed
+    if updated_html != html: output_path.write_text(updated_html, encoding='utf-8')
 
     print(f'\nDashboard updated: {output_path}')
 
@@ -1,28 +1,195 @@
+import functools
+import io
+import os
+from typing import IO
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pandas.api.types import union_categoricals
 
-def load_data(filepath: str) -> pd.DataFrame:
+# columns used by the app, after standardizing names, and their types
+DTYPES = {
+    'month': 'category',
+    'daypart': 'category',
+    'demographic': 'category',
+    'characteristic': 'category',
+    'reach_imp': 'float64',
+    'grp_imp': 'float64',
+    'reach%': 'float64',
+    'avg_freq': 'float64'
+}
+
+# Arrow types to parse columns as, with categories dictionary-encoded while parsing
+ARROW_TYPES = {
+    name: (pa.dictionary(pa.int32(), pa.string()) if dtype == 'category'
+           else pa.from_numpy_dtype(np.dtype(dtype)))
+    for name, dtype in DTYPES.items()
+}
+READ_OPTIONS = pacsv.ReadOptions(block_size=1 << 20, use_threads=True)
+
+# version of the cleaned data format in feather caches, to bump whenever read_csv_data's output changes
+CACHE_VERSION = 1
+
+# files larger than this are read in chunks of rows
+LARGE_FILE_BYTES = 256 * 1024 ** 2
+CHUNK_ROWS = 200_000
+
+# month abbreviations, as in 'Apr 2025', mapped to month numbers
+MONTH_NUMBERS = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+}
+
+def standardize_column(name: str) -> str:
+    """Strip, lowercase and underscore a CSV column name."""
+    return name.strip().lower().replace(' ', '_')
+
+def parse_months(months: pd.Index) -> pd.DatetimeIndex:
+    """Parse month strings like 'Apr 2025' to first-of-month dates, or NaT if not valid."""
+    parts = months.str.extract(r'^(\w{3})\s+(\d{4})$')
+    iso = parts[1] + '-' + parts[0].str.title().map(MONTH_NUMBERS) + '-01'
+    return pd.DatetimeIndex(pd.to_datetime(iso, format='%Y-%m-%d', errors='coerce', cache=True))
+
+def load_data(source: str | os.PathLike | IO[bytes] | bytes) -> pd.DataFrame:
+    """
+    Load and clean CSV data from a file path, a seekable binary file-like object, or bytes.
+
+    Data from a path is reused from an earlier call in the same process while the file is 
+    unchanged, and is cached to a feather file next to the CSV. The returned DataFrame may 
+    be shared, so treat it as read-only. In-memory data is parsed on each call.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        filepath = os.fspath(source)
+        stat = os.stat(filepath)
+        return _load_data(filepath, stat.st_mtime_ns, stat.st_size)
+
+    if isinstance(source, bytes): source = io.BytesIO(source)
+    return set_month_bounds(read_csv_data(source))
+
+def set_month_bounds(df: pd.DataFrame) -> pd.DataFrame:
+    """Record the first and last months of loaded data as df.attrs['month_min'] and df.attrs['month_max']."""
+    # rows are sorted by month, without missing months, so bounds are the first and last rows
+    months = df['month']
+    df.attrs['month_min'] = months.iloc[0] if len(months) else pd.NaT
+    df.attrs['month_max'] = months.iloc[-1] if len(months) else pd.NaT
+    return df
+
+def read_csv_data(source: str | IO[bytes]) -> pd.DataFrame:
+    """
+    Read and clean CSV data:
+    - Keeps only columns used by the app, and standardizes their names
+    - Stores low-cardinality string columns as categories
+    - Converts 'month' column to datetime, dropping rows without a valid month
+    - Sorts rows by month, so month ranges can be found by binary search
+
+    Parameters:
+        source (str or file-like): Path to CSV file, or a seekable binary file-like object.
+
+    Returns:
+        pd.DataFrame: The cleaned DataFrame.
+    """
+    # map raw header names to standardized names, to select and type only the columns used
+    # (readers match columns against the file's own header, so rename after)
+    header = pd.read_csv(source, nrows=0).columns
+    names = {col: standardize_column(col) for col in header if standardize_column(col) in DTYPES}
+    if hasattr(source, 'seek'): source.seek(0)
+    read_kwargs = dict(usecols=list(names), dtype={col: DTYPES[name] for col, name in names.items()})
+
+    # read large files in chunks, to limit peak memory
+    if isinstance(source, str) and os.path.getsize(source) > LARGE_FILE_BYTES:
+        chunks = []
+        for chunk in pd.read_csv(source, engine='c', chunksize=CHUNK_ROWS, **read_kwargs):
+            chunk = chunk.rename(columns=names)
+            chunk['month'] = category_months(chunk['month'])
+            chunks.append(chunk.dropna(subset=['month']))
+        df = concat_chunks(chunks)
+    else:
+        convert_options = pacsv.ConvertOptions(
+            include_columns=list(names),
+            column_types={col: ARROW_TYPES[name] for col, name in names.items()},
+            strings_can_be_null=True
+        )
+        table = pacsv.read_csv(source, read_options=READ_OPTIONS, convert_options=convert_options)
+        df = table.to_pandas().rename(columns=names)
+        df['month'] = category_months(df['month'])
+        df = df.dropna(subset=['month'])
+
+        # Arrow keeps categories in order of appearance, so sort them like pandas does
+        for col in df.select_dtypes('category'):
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+
+    return df.sort_values('month', kind='stable', ignore_index=True)
+
+def category_months(months: pd.Series) -> pd.DatetimeIndex:
+    """
+    Convert a categorical column of month strings to dates, parsing each distinct month (category) 
+    once, at second resolution since months need no finer unit, then taking parsed months by 
+    category code.
+    """
+    parsed = parse_months(months.cat.categories).as_unit('s')
+    return parsed.take(months.cat.codes, allow_fill=True, fill_value=pd.NaT)
+
+def concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate DataFrame chunks, combining categories of categorical columns that differ by chunk."""
+    if not chunks: return pd.DataFrame()
+    data = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype): data[col] = union_categoricals(parts, sort_categories=True)
+        else: data[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data)
+
+@functools.lru_cache(maxsize=8)
+def _load_data(filepath: str, mtime_ns: int, size: int) -> pd.DataFrame:
     """
-    Load and clean a CSV file:
-    - Standardizes column names
-    - Converts 'month' column to datetime
+    Load cleaned data from a CSV file, using a feather file cached next to the CSV, 
+    which is reused until the CSV is modified.
 
     Parameters:
         filepath (str): Path to CSV file.
+        mtime_ns (int): Modification time of the file, as part of the cache key.
+        size (int): Size of the file, as part of the cache key.
 
     Returns:
         pd.DataFrame: The cleaned DataFrame.
     """
-    df = pd.read_csv(filepath)
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    df['month'] = pd.to_datetime(df['month'], format="%b %Y", errors='coerce')
-    return df
+    # caches written for an older data format have a different name, so are never read
+    cache = f'{filepath}.v{CACHE_VERSION}.feather'
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(filepath):
+        df = pd.read_feather(cache)
+    else:
+        df = read_csv_data(filepath)
+
+        # write to a temporary file first, so a partly written cache is never read
+        try:
+            df.to_feather(cache + '.tmp', compression='zstd')
+            os.replace(cache + '.tmp', cache)
+        except OSError as e:
+            print(f'Could not write data cache {cache}: {e}')
+
+    return set_month_bounds(df)
+
+def parse_year_month(s: str) -> pd.Timestamp:
+    """Parse a 'YYYY-MM' string, like '2025-03', to the first day of that month."""
+    year, month = s[:4], s[5:]
+    digits = year + month
+    if len(s) != 7 or s[4] != '-' or not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f'Month "{s}" is not in YYYY-MM format')
+    return pd.Timestamp(int(year), int(month), 1)
+
+def month_bound(df: pd.DataFrame, bound: str) -> pd.Timestamp:
+    """Return the 'min' or 'max' month in df, from df.attrs if recorded by load_data."""
+    key = f'month_{bound}'
+    return df.attrs[key] if key in df.attrs else getattr(df['month'], bound)()
 
 def get_selected_months(df: pd.DataFrame, args)-> tuple[pd.Timestamp, pd.Timestamp | None]:
     """
     Determine which months to use for plotting based on args and available data.
 
     Parameters:
-        df (pd.DataFrame): The dataset containing a 'month' column.
+        df (pd.DataFrame): The dataset containing a 'month' column, with month bounds
+                           in df.attrs if loaded by load_data.
         args (argparse.Namespace): Parsed command-line arguments.
 
     Returns:
@@ -34,16 +201,12 @@ def get_selected_months(df: pd.DataFrame, args)-> tuple[pd.Timestamp, pd.Timesta
                 - month_dt is the end month (defaults to latest)
                 - compare_dt is the start month (defaults to earliest)
     """
-    latest = df['month'].max()
-    earliest = df['month'].min()
-
-    month = args.month or latest.strftime('%Y-%m')
-    if args.plot == 'timeline': compare = args.compare_month or earliest.strftime('%Y-%m')
-    else: compare = args.compare_month
-
+    # data months are already first-of-month dates, so only parse months given as args,
+    # and only look up data bounds that are needed
     try:
-        month_dt = pd.to_datetime(month, format='%Y-%m')
-        compare_dt = pd.to_datetime(compare, format='%Y-%m') if compare else None 
+        month_dt = parse_year_month(args.month) if args.month else month_bound(df, 'max')
+        if args.compare_month: compare_dt = parse_year_month(args.compare_month)
+        else: compare_dt = month_bound(df, 'min') if args.plot == 'timeline' else None
     except ValueError as e:
         raise ValueError('Month format must be YYYY-MM, e.g., 2025-03') from e
 